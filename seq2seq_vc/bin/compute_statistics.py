@@ -10,6 +10,8 @@ import argparse
 import logging
 import os
 
+from functools import partial
+
 import numpy as np
 import yaml
 
@@ -115,7 +117,7 @@ def main():
     if args.feats_scp is None:
         if config["format"] == "hdf5":
             mel_query = "*.h5"
-            mel_load_fn = lambda x: read_hdf5(x, args.feat_type)  # NOQA
+            mel_load_fn = partial(read_hdf5, hdf5_path=args.feat_type)
         elif config["format"] == "npy":
             mel_query = "*-feats.npy"
             mel_load_fn = np.load
@@ -10,6 +10,8 @@ import argparse
 import logging
 import os
 
+from functools import partial
+
 import numpy as np
 import yaml
 
@@ -130,8 +132,8 @@ def main():
     if args.rootdir is not None:
         if config["format"] == "hdf5":
             audio_query, mel_query = "*.h5", "*.h5"
-            audio_load_fn = lambda x: read_hdf5(x, "wave")  # NOQA
-            mel_load_fn = lambda x: read_hdf5(x, args.feat_type)  # NOQA
+            audio_load_fn = partial(read_hdf5, hdf5_path="wave")
+            mel_load_fn = partial(read_hdf5, hdf5_path=args.feat_type)
         elif config["format"] == "npy":
             audio_query, mel_query = "*-wave.npy", "*-feats.npy"
             audio_load_fn = np.load
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2023 Wen-Chin Huang
+#  MIT License (https://opensource.org/licenses/MIT)
+
+"""Pack per-file mel features into a single memory-mappable shard."""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+
+from tqdm import tqdm
+
+from seq2seq_vc.utils import find_files, read_hdf5
+
+
+def main():
+    """Run packing process."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Pack per-file mel features into a single mmap shard "
+            "(See detail in bin/pack_mels.py)."
+        )
+    )
+    parser.add_argument(
+        "--dumpdir",
+        type=str,
+        required=True,
+        help="directory including feature files to be packed.",
+    )
+    parser.add_argument(
+        "--mel-query",
+        type=str,
+        default="*.h5",
+        help="query to find feature files in dumpdir. (default=*.h5)",
+    )
+    parser.add_argument(
+        "--feat-type",
+        type=str,
+        default="feats",
+        help=(
+            "feature type. this is used as key name to read h5 feature files. "
+        ),
+    )
+    parser.add_argument(
+        "--outdir",
+        type=str,
+        required=True,
+        help="directory to save the packed shard.",
+    )
+    parser.add_argument(
+        "--verbose",
+        type=int,
+        default=1,
+        help="logging level. higher is more logging. (default=1)",
+    )
+    args = parser.parse_args()
+
+    # set logger
+    if args.verbose > 1:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+    elif args.verbose > 0:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+    else:
+        logging.basicConfig(
+            level=logging.WARN,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+        logging.warning("Skip DEBUG/INFO messages")
+
+    # find all of the mel files
+    mel_files = sorted(find_files(args.dumpdir, args.mel_query))
+    assert len(mel_files) != 0, f"Not found any mel files in ${args.dumpdir}."
+    logging.info(f"The number of features to be packed = {len(mel_files)}.")
+
+    # check directory existence
+    if not os.path.exists(args.outdir):
+        os.makedirs(args.outdir)
+
+    # write all mels into a flat float32 binary + frame offsets index
+    offsets = [0]
+    channels = None
+    with open(os.path.join(args.outdir, "feats.bin"), "wb") as f:
+        for mel_file in tqdm(mel_files, desc="[pack]"):
+            if mel_file.endswith(".h5"):
+                mel = read_hdf5(mel_file, args.feat_type)
+            else:
+                mel = np.load(mel_file)
+            mel = np.ascontiguousarray(mel, dtype=np.float32)
+            if channels is None:
+                channels = mel.shape[1]
+            else:
+                assert mel.shape[1] == channels, (
+                    f"Inconsistent number of channels in {mel_file} "
+                    f"({mel.shape[1]} vs {channels})."
+                )
+            f.write(mel.tobytes())
+            offsets.append(offsets[-1] + mel.shape[0])
+    np.save(
+        os.path.join(args.outdir, "offsets.npy"),
+        np.asarray(offsets, dtype=np.int64),
+    )
+    np.save(
+        os.path.join(args.outdir, "shape.npy"),
+        np.asarray([channels], dtype=np.int64),
+    )
+
+    # write utterance ids in the packing order
+    with open(os.path.join(args.outdir, "utt_ids.txt"), "w") as f:
+        for mel_file in mel_files:
+            f.write(os.path.splitext(os.path.basename(mel_file))[0] + "\n")
+
+    logging.info(f"Successfully packed {len(mel_files)} features in {args.outdir}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import logging
 import os
 import time
 
+from functools import partial
+
 import numpy as np
 import soundfile as sf
 import torch
@@ -153,7 +155,7 @@ def main():
     # get dataset
     if args.dumpdir is not None:
         mel_query = "*.h5"
-        mel_load_fn = lambda x: read_hdf5(x, args.feat_type)  # NOQA
+        mel_load_fn = partial(read_hdf5, hdf5_path=args.feat_type)
         dataset = TTSDataset(
             root_dir=args.dumpdir,
             text_path=args.text,
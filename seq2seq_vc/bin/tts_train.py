@@ -11,6 +11,8 @@ import logging
 import os
 import sys
 
+from functools import partial
+
 import numpy as np
 import torch
 import yaml
@@ -228,7 +230,7 @@ def main():
     # get dataset
     if config["format"] == "hdf5":
         mel_query = "*.h5"
-        mel_load_fn = lambda x: read_hdf5(x, args.feat_type)  # NOQA
+        mel_load_fn = partial(read_hdf5, hdf5_path=args.feat_type)
     elif config["format"] == "npy":
         mel_query = "*-feats.npy"
         mel_load_fn = np.load
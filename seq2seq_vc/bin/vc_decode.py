@@ -7,25 +7,101 @@
 """Decode with trained VC model."""
 
 import argparse
+import io
 import logging
 import os
+import tarfile
 import time
 
-import numpy as np
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import h5py
 import soundfile as sf
 import torch
 import yaml
 
+from torch.utils.data import DataLoader, Subset
 from tqdm import tqdm
 
 import seq2seq_vc.models
-from seq2seq_vc.datasets import SourceVCMelDataset
-from seq2seq_vc.utils import read_hdf5, write_hdf5
+from seq2seq_vc.datasets import PackedMelDataset, SourceVCMelDataset
+from seq2seq_vc.modules.transformer.attention import enable_sdpa
+from seq2seq_vc.samplers import LengthBucketSampler
+from seq2seq_vc.utils import read_hdf5, write_hdf5_direct
 from seq2seq_vc.utils.plot import plot_attention, plot_generated_and_ref_2d, plot_1d
 from seq2seq_vc.vocoder import Vocoder
 from seq2seq_vc.vocoder.s3prl_feat2wav import S3PRL_Feat2Wav
 
 
+def pad_collate(batch):
+    """Collate a batch of (utt_id, mel) pairs for batched inference.
+
+    Args:
+        batch (list): List of (utt_id, ndarray) pairs.
+
+    Returns:
+        list: List of utterance ids.
+        Tensor: Batch of padded input features (B, Tmax, idim).
+        LongTensor: Batch of lengths of each input (B,).
+
+    """
+    utt_ids = [utt_id for utt_id, _ in batch]
+    xs = [torch.from_numpy(x).float() for _, x in batch]
+    ilens = torch.tensor([x.size(0) for x in xs], dtype=torch.long)
+    xs = torch.nn.utils.rnn.pad_sequence(xs, batch_first=True)
+    return utt_ids, xs, ilens
+
+
+class PinnedCopyBuffer(object):
+    """Reusable pinned staging buffer for asynchronous device-to-host copies.
+
+    Copies are issued on a dedicated side stream so the default stream can
+    keep computing; synchronization happens only when the host array is
+    actually needed.
+    """
+
+    def __init__(self):
+        """Initialize pinned copy buffer."""
+        self.buffer = None
+
+    def copy_async(self, tensor, stream):
+        """Start an asynchronous device-to-host copy.
+
+        Args:
+            tensor (Tensor): Device tensor to be copied.
+            stream (torch.cuda.Stream): Stream to issue the copy on.
+
+        Returns:
+            func: Function returning the host ndarray, synchronizing on the
+                copy completion when first called.
+
+        """
+        tensor = tensor.contiguous()
+        numel = tensor.numel()
+        if (
+            self.buffer is None
+            or self.buffer.numel() < numel
+            or self.buffer.dtype != tensor.dtype
+        ):
+            # grow on demand; the pinned pages are reused afterwards
+            self.buffer = torch.empty(numel, dtype=tensor.dtype, pin_memory=True)
+        staging = self.buffer[:numel].view(tensor.shape)
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            staging.copy_(tensor, non_blocking=True)
+        event = torch.cuda.Event()
+        event.record(stream)
+
+        def _materialize():
+            event.synchronize()
+            # detach from the reusable staging storage before handing out
+            return staging.numpy().copy()
+
+        return _materialize
+
+
 def main():
     """Run decoding process."""
     parser = argparse.ArgumentParser(
@@ -52,6 +128,15 @@ def main():
             "you need to specify either feats-scp or dumpdir."
         ),
     )
+    parser.add_argument(
+        "--packed-dir",
+        default=None,
+        type=str,
+        help=(
+            "directory including a packed mmap shard created by pack_mels.py. "
+            "preferred over per-file reads when given."
+        ),
+    )
     parser.add_argument(
         "--trg-stats",
         type=str,
@@ -95,6 +180,92 @@ def main():
             "target feature type. this is used as key name to read h5 feature files. "
         ),
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help=(
+            "number of utterances to be decoded in parallel. "
+            "batches are built with length bucketing to limit padding. (default=1)"
+        ),
+    )
+    parser.add_argument(
+        "--max-frames-per-batch",
+        type=int,
+        default=None,
+        help=(
+            "maximum number of padded frames in a batch. "
+            "only used when batch-size > 1. (default=None)"
+        ),
+    )
+    parser.add_argument(
+        "--aggregate",
+        type=int,
+        default=0,
+        help=(
+            "number of utterances to aggregate per output file. with K > 0, "
+            "feats are grouped into batch_{n}.h5 files of K datasets each and "
+            "waveforms are streamed into a single tar, avoiding per-utterance "
+            "file creation. (default=0, one file per utterance)"
+        ),
+    )
+    parser.add_argument(
+        "--precision",
+        type=str,
+        default="fp32",
+        choices=["fp32", "bf16", "fp16"],
+        help=(
+            "precision used for model and vocoder inference via autocast. "
+            "only effective on CUDA devices. (default=fp32)"
+        ),
+    )
+    parser.add_argument(
+        "--cuda-graphs",
+        default=False,
+        action="store_true",
+        help=(
+            "replay the decoder step from captured CUDA graphs to cut kernel "
+            "launch overhead. only effective on CUDA for models with the "
+            "encode/decode_iter API."
+        ),
+    )
+    parser.add_argument(
+        "--sdpa",
+        default=False,
+        action="store_true",
+        help=(
+            "use fused scaled-dot-product attention kernels. the attention "
+            "maps are not materialized on this path, so attention plots are "
+            "skipped when enabled."
+        ),
+    )
+    parser.add_argument(
+        "--jit",
+        default=False,
+        action="store_true",
+        help=(
+            "compile the model with TorchScript and optimize it for inference. "
+            "falls back to eager mode when scripting fails for the model type."
+        ),
+    )
+    parser.add_argument(
+        "--plot-workers",
+        type=int,
+        default=0,
+        help=(
+            "number of worker processes for figure plotting. with workers > 0, "
+            "matplotlib rendering overlaps with inference. (default=0)"
+        ),
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=0,
+        help=(
+            "number of dataloader workers. with workers > 0, feature loading "
+            "overlaps with GPU inference. (default=0)"
+        ),
+    )
     parser.add_argument(
         "--verbose",
         type=int,
@@ -142,15 +313,23 @@ def main():
     }
 
     # check arguments
-    if (args.feats_scp is not None and args.dumpdir is not None) or (
-        args.feats_scp is None and args.dumpdir is None
+    if args.packed_dir is None and (
+        (args.feats_scp is not None and args.dumpdir is not None)
+        or (args.feats_scp is None and args.dumpdir is None)
     ):
-        raise ValueError("Please specify either --dumpdir or --feats-scp.")
+        raise ValueError(
+            "Please specify either --packed-dir, --dumpdir or --feats-scp."
+        )
 
     # get dataset
-    if args.dumpdir is not None:
+    if args.packed_dir is not None:
+        dataset = PackedMelDataset(
+            packed_dir=args.packed_dir,
+            return_utt_id=True,
+        )
+    elif args.dumpdir is not None:
         mel_query = "*.h5"
-        mel_load_fn = lambda x: read_hdf5(x, args.src_feat_type)  # NOQA
+        mel_load_fn = partial(read_hdf5, hdf5_path=args.src_feat_type)
         dataset = SourceVCMelDataset(
             src_root_dir=args.dumpdir,
             mel_query=mel_query,
@@ -165,12 +344,35 @@ def main():
         )
     logging.info(f"The number of features to be decoded = {len(dataset)}.")
 
-    # setup device
-    if torch.cuda.is_available():
+    # setup device and distributed processing
+    # when launched via torchrun, each process decodes a non-overlapping shard
+    # of the dataset; no aggregation is needed because outputs are keyed by utt_id
+    distributed = int(os.environ.get("WORLD_SIZE", 1)) > 1
+    if distributed:
+        local_rank = int(os.environ.get("LOCAL_RANK", 0))
+        if torch.cuda.is_available():
+            torch.cuda.set_device(local_rank)
+            device = torch.device(f"cuda:{local_rank}")
+            torch.distributed.init_process_group(backend="nccl")
+        else:
+            device = torch.device("cpu")
+            torch.distributed.init_process_group(backend="gloo")
+        rank = torch.distributed.get_rank()
+        world_size = torch.distributed.get_world_size()
+        indices = list(range(len(dataset)))[rank::world_size]
+        dataset = Subset(dataset, indices)
+        logging.info(
+            f"Rank {rank} / {world_size} decodes {len(dataset)} utterances."
+        )
+    elif torch.cuda.is_available():
         device = torch.device("cuda")
     else:
         device = torch.device("cpu")
 
+    # allow TF32 matmuls and cudnn autotuning of fixed-shape kernels
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.benchmark = True
+
     # get model and load parameters
     model_class = getattr(seq2seq_vc.models, config["model_type"])
     model = model_class(**config["model_params"])
@@ -178,6 +380,42 @@ def main():
     model = model.eval().to(device)
     logging.info(f"Loaded model parameters from {args.checkpoint}.")
 
+    # optionally switch attention modules to fused SDPA kernels
+    if args.sdpa:
+        enable_sdpa(model)
+        logging.info(
+            "Enabled fused scaled-dot-product attention; "
+            "attention plots will be skipped."
+        )
+
+    # optionally compile with TorchScript to fuse ops and remove Python dispatch
+    if args.jit:
+        try:
+            scripted = torch.jit.script(model)
+            # freeze() only keeps forward by default, so the decode entry
+            # points used below must be preserved explicitly; if none of them
+            # was compiled, keep the eager module instead of shipping a
+            # frozen module that cannot decode
+            entry_points = [
+                name
+                for name in ["inference", "encode", "decode_iter", "batch_inference"]
+                if hasattr(scripted, name)
+            ]
+            if len(entry_points) == 0:
+                raise RuntimeError(
+                    "no decode entry point was compiled; only forward is available"
+                )
+            frozen = torch.jit.freeze(scripted, preserved_attrs=entry_points)
+            model = torch.jit.optimize_for_inference(
+                frozen, other_methods=entry_points
+            )
+            logging.info("Compiled the model with TorchScript.")
+        except Exception as e:
+            logging.warning(
+                f"Failed to compile {config['model_type']} with TorchScript. "
+                f"Falling back to eager mode. ({e})"
+            )
+
     # load vocoder if provided
     if config.get("vocoder", False):
         if config["vocoder"].get("vocoder_type", "") == "s3prl_vc":
@@ -201,60 +439,282 @@ def main():
                 ],  # this is used to denormalized the converted features,
             )
 
-    # start generation
-    with torch.no_grad(), tqdm(dataset, desc="[decode]") as pbar:
-        for idx, (utt_id, x) in enumerate(pbar, 1):
-            x = torch.tensor(x, dtype=torch.float).to(device)
-
-            # actually decoding
-            start_time = time.time()
-            outs, probs, att_ws = model.inference(x, config["inference"], spemb=None)
-            logging.info(
-                "inference speed = %.1f frames / sec."
-                % (int(outs.size(0)) / (time.time() - start_time))
-            )
+    # setup autocast context for reduced-precision inference
+    amp_dtype = {
+        "fp32": torch.float32,
+        "bf16": torch.bfloat16,
+        "fp16": torch.float16,
+    }[args.precision]
+    amp_enabled = args.precision != "fp32" and device.type == "cuda"
+    if args.precision != "fp32" and not amp_enabled:
+        logging.warning(
+            f"--precision {args.precision} is only effective on CUDA devices. "
+            "Decoding in fp32."
+        )
+
+    def _autocast():
+        return torch.autocast(
+            device_type=device.type, dtype=amp_dtype, enabled=amp_enabled
+        )
+
+    # setup plot dispatcher: with plot workers, matplotlib rendering and PNG
+    # encoding run on a process pool instead of blocking the decode loop
+    if args.plot_workers > 0:
+        plot_pool = ProcessPoolExecutor(max_workers=args.plot_workers)
+        plot_futures = deque()
+
+        def _submit_plot(plot_fn, *plot_args, **plot_kwargs):
+            # keep the queue bounded so pending arrays do not pile up in memory
+            while len(plot_futures) >= 4 * args.plot_workers:
+                plot_futures.popleft().result()
+            plot_futures.append(plot_pool.submit(plot_fn, *plot_args, **plot_kwargs))
+
+    else:
+        plot_pool = None
+
+        def _submit_plot(plot_fn, *plot_args, **plot_kwargs):
+            plot_fn(*plot_args, **plot_kwargs)
+
+    # setup a dedicated stream with pinned staging buffers so device-to-host
+    # copies overlap with vocoder synthesis on the default stream
+    if device.type == "cuda":
+        copy_stream = torch.cuda.Stream()
+        stagings = {name: PinnedCopyBuffer() for name in ["outs", "probs", "att_ws"]}
+    else:
+        copy_stream = None
 
-            # plot figures
-            plot_generated_and_ref_2d(
-                outs.cpu().numpy(),
-                config["outdir"] + f"/outs/{utt_id}.png",
-                origin="lower",
+    # setup aggregated writers: with --aggregate K, feats are grouped into
+    # batch_{n}.h5 files of K datasets each and waveforms are streamed into a
+    # single tar, removing per-utterance file creation overhead
+    # each rank gets its own files so shards never collide under torchrun
+    agg_suffix = f".rank{rank}" if distributed else ""
+    agg_state = {"h5": None, "count": 0, "n": 0, "tar": None}
+
+    def _write_feats_aggregated(utt_id, arr):
+        if agg_state["h5"] is None:
+            agg_state["h5"] = h5py.File(
+                os.path.join(
+                    config["outdir"],
+                    args.trg_feat_type,
+                    f"batch_{agg_state['n']}{agg_suffix}.h5",
+                ),
+                "w",
             )
-            plot_1d(
-                probs.cpu().numpy(),
-                config["outdir"] + f"/probs/{utt_id}_prob.png",
+        agg_state["h5"].create_dataset(utt_id, data=arr, compression=None)
+        agg_state["count"] += 1
+        if agg_state["count"] >= args.aggregate:
+            agg_state["h5"].flush()
+            agg_state["h5"].close()
+            agg_state["h5"] = None
+            agg_state["count"] = 0
+            agg_state["n"] += 1
+
+    def _write_wav(utt_id, outs):
+        """Synthesize and write the waveform of a single utterance."""
+        if not config.get("vocoder", False):
+            return
+
+        with _autocast():
+            y, sr = vocoder.decode(outs)
+        # cast back to fp32 before the host copy; numpy/soundfile cannot
+        # handle the reduced-precision dtypes produced under autocast
+        y = y.float()
+        if args.aggregate > 0:
+            if agg_state["tar"] is None:
+                agg_state["tar"] = tarfile.open(
+                    os.path.join(config["outdir"], "wav", f"wav{agg_suffix}.tar"),
+                    "w",
+                )
+            buf = io.BytesIO()
+            sf.write(buf, y.cpu().numpy(), sr, "PCM_16", format="WAV")
+            info = tarfile.TarInfo(f"{utt_id}.wav")
+            info.size = buf.getbuffer().nbytes
+            buf.seek(0)
+            agg_state["tar"].addfile(info, buf)
+        else:
+            sf.write(
+                os.path.join(config["outdir"], "wav", f"{utt_id}.wav"),
+                y.cpu().numpy(),
+                sr,
+                "PCM_16",
             )
-            plot_attention(
-                att_ws.cpu().numpy(),
+
+    def _process_utt(utt_id, outs, probs, att_ws):
+        """Plot and write results of a single utterance."""
+        # cast back to fp32 (numpy has no bf16/fp16 path) and copy each tensor
+        # to host once, reusing the copy for both plotting and writing
+        outs = outs.detach().float()
+        probs = probs.detach().float()
+        # attention maps are unavailable under fused SDPA
+        if att_ws is not None:
+            att_ws = att_ws.detach().float()
+        if copy_stream is not None:
+            # issue the copies first, then synthesize the waveform while they
+            # are in flight; materialize the host arrays afterwards
+            get_outs = stagings["outs"].copy_async(outs, copy_stream)
+            get_probs = stagings["probs"].copy_async(probs, copy_stream)
+            if att_ws is not None:
+                get_att_ws = stagings["att_ws"].copy_async(att_ws, copy_stream)
+            _write_wav(utt_id, outs)
+            outs_cpu = get_outs()
+            probs_cpu = get_probs()
+            att_ws_cpu = get_att_ws() if att_ws is not None else None
+        else:
+            outs_cpu = outs.cpu().numpy()
+            probs_cpu = probs.cpu().numpy()
+            att_ws_cpu = att_ws.cpu().numpy() if att_ws is not None else None
+            _write_wav(utt_id, outs)
+
+        # plot figures
+        _submit_plot(
+            plot_generated_and_ref_2d,
+            outs_cpu,
+            config["outdir"] + f"/outs/{utt_id}.png",
+            origin="lower",
+        )
+        _submit_plot(
+            plot_1d,
+            probs_cpu,
+            config["outdir"] + f"/probs/{utt_id}_prob.png",
+        )
+        if att_ws_cpu is not None:
+            _submit_plot(
+                plot_attention,
+                att_ws_cpu,
                 config["outdir"] + f"/att_ws/{utt_id}_att_ws.png",
             )
 
-            # write feats
-            if not os.path.exists(os.path.join(config["outdir"], args.trg_feat_type)):
-                os.makedirs(
-                    os.path.join(config["outdir"], args.trg_feat_type), exist_ok=True
-                )
-
-            write_hdf5(
+        # write feats
+        # outs is cast to fp32 on device above, so outs_cpu is already float32
+        # and can be written without another host-side cast-and-copy
+        if args.aggregate > 0:
+            _write_feats_aggregated(utt_id, outs_cpu)
+        else:
+            write_hdf5_direct(
                 config["outdir"] + f"/{args.trg_feat_type}/{utt_id}.h5",
                 args.trg_feat_type,
-                outs.cpu().numpy().astype(np.float32),
+                outs_cpu,
             )
 
-            # write waveform if vocoder is provided
-            if config.get("vocoder", False):
+    # create output directories once instead of checking them per utterance
+    os.makedirs(os.path.join(config["outdir"], args.trg_feat_type), exist_ok=True)
+    if config.get("vocoder", False):
+        os.makedirs(os.path.join(config["outdir"], "wav"), exist_ok=True)
+    for subdir in ["outs", "probs", "att_ws"]:
+        os.makedirs(os.path.join(config["outdir"], subdir), exist_ok=True)
 
-                if not os.path.exists(os.path.join(config["outdir"], "wav")):
-                    os.makedirs(os.path.join(config["outdir"], "wav"), exist_ok=True)
+    # start generation
+    # multi-worker loading overlaps h5 reads with inference on the main process
+    loader_kwargs = {
+        "num_workers": args.num_workers,
+        "pin_memory": device.type == "cuda",
+    }
+    if args.num_workers > 0:
+        loader_kwargs["prefetch_factor"] = 4
+    if args.batch_size > 1 and hasattr(model, "batch_inference"):
+        # group utterances of similar lengths to limit padding overhead
+        if isinstance(dataset, Subset):
+            base_dataset, indices = dataset.dataset, dataset.indices
+        else:
+            base_dataset, indices = dataset, range(len(dataset))
+        lengths = base_dataset.lengths()[list(indices)]
+        loader = DataLoader(
+            dataset,
+            batch_sampler=LengthBucketSampler(
+                lengths, args.batch_size, args.max_frames_per_batch
+            ),
+            collate_fn=pad_collate,
+            **loader_kwargs,
+        )
+        with torch.inference_mode(), tqdm(loader, desc="[decode]") as pbar:
+            for idx, (utt_ids, xs, ilens) in enumerate(pbar, 1):
+                xs = xs.to(device)
+                ilens = ilens.to(device)
+
+                # actually decoding
+                start_time = time.time()
+                with _autocast():
+                    outs_list, probs_list, att_ws_list = model.batch_inference(
+                        xs, ilens, config["inference"]
+                    )
+                n_frames = sum(int(outs.size(0)) for outs in outs_list)
+                logging.info(
+                    "inference speed = %.1f frames / sec."
+                    % (n_frames / (time.time() - start_time))
+                )
+
+                for utt_id, outs, probs, att_ws in zip(
+                    utt_ids, outs_list, probs_list, att_ws_list
+                ):
+                    _process_utt(utt_id, outs, probs, att_ws)
+
+                # release per-batch tensors and periodically return cached
+                # allocator blocks to avoid memory creep over long runs
+                del outs_list, probs_list, att_ws_list
+                if device.type == "cuda" and (idx % 50) == 0:
+                    torch.cuda.empty_cache()
+    else:
+        if args.batch_size > 1:
+            logging.warning(
+                f"{config['model_type']} does not support batch_inference. "
+                "Falling back to utterance-by-utterance decoding."
+            )
+        loader = DataLoader(dataset, batch_size=None, **loader_kwargs)
+        with torch.inference_mode(), tqdm(loader, desc="[decode]") as pbar:
+            for idx, (utt_id, x) in enumerate(pbar, 1):
+                # batch_size=None disables collation, so x arrives as an
+                # unbatched tensor converted from the loaded ndarray; mmap or
+                # shared-cache views can carry non-trivial strides, so make the
+                # (T, C) input dense to avoid stride-driven gather kernels
+                x = x.to(device=device, dtype=torch.float, non_blocking=True)
+                x = x.contiguous()
 
-                y, sr = vocoder.decode(outs)
-                sf.write(
-                    os.path.join(config["outdir"], "wav", f"{utt_id}.wav"),
-                    y.cpu().numpy(),
-                    sr,
-                    "PCM_16",
+                # actually decoding
+                # run the encoder once per utterance and reuse its memory
+                # across all decoder steps when the model supports it
+                start_time = time.time()
+                with _autocast():
+                    if hasattr(model, "encode") and hasattr(model, "decode_iter"):
+                        mem = model.encode(x)
+                        outs, probs, att_ws = model.decode_iter(
+                            mem,
+                            config["inference"],
+                            use_cuda_graphs=args.cuda_graphs,
+                        )
+                    else:
+                        outs, probs, att_ws = model.inference(
+                            x, config["inference"], spemb=None
+                        )
+                logging.info(
+                    "inference speed = %.1f frames / sec."
+                    % (int(outs.size(0)) / (time.time() - start_time))
                 )
 
+                _process_utt(utt_id, outs, probs, att_ws)
+
+                # release per-utterance tensors and periodically return cached
+                # allocator blocks to avoid memory creep over long runs
+                del outs, probs, att_ws
+                if device.type == "cuda" and (idx % 50) == 0:
+                    torch.cuda.empty_cache()
+
+    # flush any open aggregated writers
+    if agg_state["h5"] is not None:
+        agg_state["h5"].flush()
+        agg_state["h5"].close()
+    if agg_state["tar"] is not None:
+        agg_state["tar"].close()
+
+    # wait for the remaining plots
+    if plot_pool is not None:
+        while len(plot_futures) > 0:
+            plot_futures.popleft().result()
+        plot_pool.shutdown(wait=True)
+
+    # wait for all ranks before exiting
+    if distributed:
+        torch.distributed.barrier()
+
 
 if __name__ == "__main__":
     main()
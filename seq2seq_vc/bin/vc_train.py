@@ -13,6 +13,7 @@ import sys
 import time
 
 from collections import defaultdict, OrderedDict
+from functools import partial
 
 import matplotlib
 import numpy as np
@@ -660,8 +661,8 @@ def main():
     # get dataset
     if config["format"] == "hdf5":
         mel_query = "*.h5"
-        src_mel_load_fn = lambda x: read_hdf5(x, args.src_feat_type)  # NOQA
-        trg_mel_load_fn = lambda x: read_hdf5(x, args.trg_feat_type)  # NOQA
+        src_mel_load_fn = partial(read_hdf5, hdf5_path=args.src_feat_type)
+        trg_mel_load_fn = partial(read_hdf5, hdf5_path=args.trg_feat_type)
     elif config["format"] == "npy":
         mel_query = "*-feats.npy"
         src_mel_load_fn = np.load
@@ -1,2 +1,3 @@
 from .dataset import *  # NOQA
 from .audio_mel_dataset import *  # NOQA
+from .packed_mel_dataset import *  # NOQA
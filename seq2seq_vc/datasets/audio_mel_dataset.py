@@ -8,16 +8,52 @@
 import logging
 import os
 
-from multiprocessing import Manager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import numpy as np
+import torch
 
 from torch.utils.data import Dataset
 
 from seq2seq_vc.utils import find_files
+from seq2seq_vc.utils import get_length_cached
 from seq2seq_vc.utils import read_hdf5
 
 
+def _scan_lengths(files, load_fn):
+    """Get the lengths of the given files, loading in parallel threads.
+
+    Args:
+        files (list): List of filenames to scan.
+        load_fn (func): Function to load a file, used when the length is not
+            available from a sidecar cache or the file metadata.
+
+    Returns:
+        list: List of lengths (in frames or samples).
+
+    """
+    with ThreadPoolExecutor() as pool:
+        return list(
+            pool.map(lambda f: get_length_cached(f, load_fn=load_fn), files)
+        )
+
+
+def _to_shared_tensor(array):
+    """Move an ndarray into shared memory for zero-copy access across workers.
+
+    Args:
+        array (ndarray): Array to be shared.
+
+    Returns:
+        Tensor: Shared-memory tensor wrapping the array contents.
+
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(array))
+    tensor.share_memory_()
+    return tensor
+
+
 class AudioMelDataset(Dataset):
     """PyTorch compatible audio and mel dataset."""
 
@@ -26,8 +62,8 @@ class AudioMelDataset(Dataset):
         root_dir,
         audio_query="*.h5",
         mel_query="*.h5",
-        audio_load_fn=lambda x: read_hdf5(x, "wave"),
-        mel_load_fn=lambda x: read_hdf5(x, "feats"),
+        audio_load_fn=partial(read_hdf5, hdf5_path="wave"),
+        mel_load_fn=partial(read_hdf5, hdf5_path="feats"),
         audio_length_threshold=None,
         mel_length_threshold=None,
         return_utt_id=False,
@@ -53,7 +89,7 @@ class AudioMelDataset(Dataset):
 
         # filter by threshold
         if audio_length_threshold is not None:
-            audio_lengths = [audio_load_fn(f).shape[0] for f in audio_files]
+            audio_lengths = _scan_lengths(audio_files, audio_load_fn)
             idxs = [
                 idx
                 for idx in range(len(audio_files))
@@ -67,7 +103,7 @@ class AudioMelDataset(Dataset):
             audio_files = [audio_files[idx] for idx in idxs]
             mel_files = [mel_files[idx] for idx in idxs]
         if mel_length_threshold is not None:
-            mel_lengths = [mel_load_fn(f).shape[0] for f in mel_files]
+            mel_lengths = _scan_lengths(mel_files, mel_load_fn)
             idxs = [
                 idx
                 for idx in range(len(mel_files))
@@ -88,10 +124,13 @@ class AudioMelDataset(Dataset):
             f" {len(mel_files)})."
         )
 
-        self.audio_files = audio_files
+        # store file paths as object arrays (SoA) to keep the resident
+        # footprint small and make indexing cheap for large corpora
+        self.audio_files = np.array(audio_files, dtype=object)
         self.audio_load_fn = audio_load_fn
         self.mel_load_fn = mel_load_fn
-        self.mel_files = mel_files
+        self.mel_files = np.array(mel_files, dtype=object)
+        self._mel_lengths = None
         if ".npy" in audio_query:
             self.utt_ids = [
                 os.path.basename(f).replace("-wave.npy", "") for f in audio_files
@@ -103,10 +142,16 @@ class AudioMelDataset(Dataset):
         self.return_utt_id = return_utt_id
         self.allow_cache = allow_cache
         if allow_cache:
-            # NOTE(kan-bayashi): Manager is need to share memory in dataloader with num_workers > 0
-            self.manager = Manager()
-            self.caches = self.manager.list()
-            self.caches += [() for _ in range(len(audio_files))]
+            # NOTE: pre-load everything into shared-memory tensors so that cached
+            # arrays are zero-copy across dataloader workers instead of
+            # round-tripping through a multiprocessing.Manager proxy per access
+            self.caches = [
+                (
+                    _to_shared_tensor(audio_load_fn(audio_file)),
+                    _to_shared_tensor(mel_load_fn(mel_file)),
+                )
+                for audio_file, mel_file in zip(audio_files, mel_files)
+            ]
 
     def __getitem__(self, idx):
         """Get specified idx items.
@@ -120,21 +165,18 @@ class AudioMelDataset(Dataset):
             ndarray: Feature (T', C).
 
         """
-        if self.allow_cache and len(self.caches[idx]) != 0:
-            return self.caches[idx]
-
         utt_id = self.utt_ids[idx]
-        audio = self.audio_load_fn(self.audio_files[idx])
-        mel = self.mel_load_fn(self.mel_files[idx])
+        if self.allow_cache:
+            audio, mel = (t.numpy() for t in self.caches[idx])
+        else:
+            audio = self.audio_load_fn(self.audio_files[idx])
+            mel = self.mel_load_fn(self.mel_files[idx])
 
         if self.return_utt_id:
             items = utt_id, audio, mel
         else:
             items = audio, mel
 
-        if self.allow_cache:
-            self.caches[idx] = items
-
         return items
 
     def __len__(self):
@@ -146,6 +188,20 @@ class AudioMelDataset(Dataset):
         """
         return len(self.audio_files)
 
+    def lengths(self):
+        """Return mel lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each feature sequence (in frames).
+
+        """
+        if self._mel_lengths is None:
+            self._mel_lengths = np.asarray(
+                _scan_lengths(self.mel_files.tolist(), self.mel_load_fn),
+                dtype=np.int64,
+            )
+        return self._mel_lengths
+
 
 class AudioDataset(Dataset):
     """PyTorch compatible audio dataset."""
@@ -175,7 +231,7 @@ class AudioDataset(Dataset):
 
         # filter by threshold
         if audio_length_threshold is not None:
-            audio_lengths = [audio_load_fn(f).shape[0] for f in audio_files]
+            audio_lengths = _scan_lengths(audio_files, audio_load_fn)
             idxs = [
                 idx
                 for idx in range(len(audio_files))
@@ -191,8 +247,9 @@ class AudioDataset(Dataset):
         # assert the number of files
         assert len(audio_files) != 0, f"Not found any audio files in ${root_dir}."
 
-        self.audio_files = audio_files
+        self.audio_files = np.array(audio_files, dtype=object)
         self.audio_load_fn = audio_load_fn
+        self._audio_lengths = None
         self.return_utt_id = return_utt_id
         if ".npy" in audio_query:
             self.utt_ids = [
@@ -204,10 +261,13 @@ class AudioDataset(Dataset):
             ]
         self.allow_cache = allow_cache
         if allow_cache:
-            # NOTE(kan-bayashi): Manager is need to share memory in dataloader with num_workers > 0
-            self.manager = Manager()
-            self.caches = self.manager.list()
-            self.caches += [() for _ in range(len(audio_files))]
+            # NOTE: pre-load everything into shared-memory tensors so that cached
+            # arrays are zero-copy across dataloader workers instead of
+            # round-tripping through a multiprocessing.Manager proxy per access
+            self.caches = [
+                _to_shared_tensor(audio_load_fn(audio_file))
+                for audio_file in audio_files
+            ]
 
     def __getitem__(self, idx):
         """Get specified idx items.
@@ -220,20 +280,17 @@ class AudioDataset(Dataset):
             ndarray: Audio (T,).
 
         """
-        if self.allow_cache and len(self.caches[idx]) != 0:
-            return self.caches[idx]
-
         utt_id = self.utt_ids[idx]
-        audio = self.audio_load_fn(self.audio_files[idx])
+        if self.allow_cache:
+            audio = self.caches[idx].numpy()
+        else:
+            audio = self.audio_load_fn(self.audio_files[idx])
 
         if self.return_utt_id:
             items = utt_id, audio
         else:
             items = audio
 
-        if self.allow_cache:
-            self.caches[idx] = items
-
         return items
 
     def __len__(self):
@@ -245,6 +302,20 @@ class AudioDataset(Dataset):
         """
         return len(self.audio_files)
 
+    def lengths(self):
+        """Return audio lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each audio signal (in samples).
+
+        """
+        if self._audio_lengths is None:
+            self._audio_lengths = np.asarray(
+                _scan_lengths(self.audio_files.tolist(), self.audio_load_fn),
+                dtype=np.int64,
+            )
+        return self._audio_lengths
+
 
 class MelDataset(Dataset):
     """PyTorch compatible mel dataset."""
@@ -274,7 +345,7 @@ class MelDataset(Dataset):
 
         # filter by threshold
         if mel_length_threshold is not None:
-            mel_lengths = [mel_load_fn(f).shape[0] for f in mel_files]
+            mel_lengths = _scan_lengths(mel_files, mel_load_fn)
             idxs = [
                 idx
                 for idx in range(len(mel_files))
@@ -290,9 +361,9 @@ class MelDataset(Dataset):
         # assert the number of files
         assert len(mel_files) != 0, f"Not found any mel files in ${root_dir}."
 
-        self.mel_files = mel_files
+        self.mel_files = np.array(mel_files, dtype=object)
         self.mel_load_fn = mel_load_fn
-        self.utt_ids = [os.path.splitext(os.path.basename(f))[0] for f in mel_files]
+        self._mel_lengths = None
         if ".npy" in mel_query:
             self.utt_ids = [
                 os.path.basename(f).replace("-feats.npy", "") for f in mel_files
@@ -302,10 +373,12 @@ class MelDataset(Dataset):
         self.return_utt_id = return_utt_id
         self.allow_cache = allow_cache
         if allow_cache:
-            # NOTE(kan-bayashi): Manager is need to share memory in dataloader with num_workers > 0
-            self.manager = Manager()
-            self.caches = self.manager.list()
-            self.caches += [() for _ in range(len(mel_files))]
+            # NOTE: pre-load everything into shared-memory tensors so that cached
+            # arrays are zero-copy across dataloader workers instead of
+            # round-tripping through a multiprocessing.Manager proxy per access
+            self.caches = [
+                _to_shared_tensor(mel_load_fn(mel_file)) for mel_file in mel_files
+            ]
 
     def __getitem__(self, idx):
         """Get specified idx items.
@@ -318,20 +391,17 @@ class MelDataset(Dataset):
             ndarray: Feature (T', C).
 
         """
-        if self.allow_cache and len(self.caches[idx]) != 0:
-            return self.caches[idx]
-
         utt_id = self.utt_ids[idx]
-        mel = self.mel_load_fn(self.mel_files[idx])
+        if self.allow_cache:
+            mel = self.caches[idx].numpy()
+        else:
+            mel = self.mel_load_fn(self.mel_files[idx])
 
         if self.return_utt_id:
             items = utt_id, mel
         else:
             items = mel
 
-        if self.allow_cache:
-            self.caches[idx] = items
-
         return items
 
     def __len__(self):
@@ -343,6 +413,20 @@ class MelDataset(Dataset):
         """
         return len(self.mel_files)
 
+    def lengths(self):
+        """Return mel lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each feature sequence (in frames).
+
+        """
+        if self._mel_lengths is None:
+            self._mel_lengths = np.asarray(
+                _scan_lengths(self.mel_files.tolist(), self.mel_load_fn),
+                dtype=np.int64,
+            )
+        return self._mel_lengths
+
 
 class ParallelVCMelDataset(Dataset):
     """PyTorch compatible mel-to-mel dataset for parallel VC."""
@@ -376,10 +460,13 @@ class ParallelVCMelDataset(Dataset):
         assert len(src_mel_files) != 0, f"Not found any mel files in ${src_root_dir}."
         assert len(trg_mel_files) != 0, f"Not found any mel files in ${trg_root_dir}."
 
-        self.src_mel_files = src_mel_files
-        self.trg_mel_files = trg_mel_files
+        # keep source and target paths as two parallel object arrays instead
+        # of materializing a list of pairs
+        self.src_mel_files = np.array(src_mel_files, dtype=object)
+        self.trg_mel_files = np.array(trg_mel_files, dtype=object)
         self.src_load_fn = src_load_fn
         self.trg_load_fn = trg_load_fn
+        self._src_mel_lengths = None
 
         # make sure the utt ids match
         src_utt_ids = sorted(
@@ -393,14 +480,19 @@ class ParallelVCMelDataset(Dataset):
         ), f"{len(set(src_utt_ids))} {len(set(trg_utt_ids))}{set(src_utt_ids).difference(set(trg_utt_ids))}"
         self.utt_ids = src_utt_ids
 
-        self.mel_files = list(zip(self.src_mel_files, self.trg_mel_files))
         self.return_utt_id = return_utt_id
         self.allow_cache = allow_cache
         if allow_cache:
-            # NOTE(kan-bayashi): Manager is need to share memory in dataloader with num_workers > 0
-            self.manager = Manager()
-            self.caches = self.manager.list()
-            self.caches += [() for _ in range(len(self.mel_files))]
+            # NOTE: pre-load everything into shared-memory tensors so that cached
+            # arrays are zero-copy across dataloader workers instead of
+            # round-tripping through a multiprocessing.Manager proxy per access
+            self.caches = [
+                (
+                    _to_shared_tensor(src_load_fn(src_file)),
+                    _to_shared_tensor(trg_load_fn(trg_file)),
+                )
+                for src_file, trg_file in zip(src_mel_files, trg_mel_files)
+            ]
 
     def __getitem__(self, idx):
         """Get specified idx items.
@@ -413,21 +505,18 @@ class ParallelVCMelDataset(Dataset):
             ndarray: Feature (T', C).
 
         """
-        if self.allow_cache and len(self.caches[idx]) != 0:
-            return self.caches[idx]
-
         utt_id = self.utt_ids[idx]
-        src_mel = self.src_load_fn(self.mel_files[idx][0])
-        trg_mel = self.trg_load_fn(self.mel_files[idx][1])
+        if self.allow_cache:
+            src_mel, trg_mel = (t.numpy() for t in self.caches[idx])
+        else:
+            src_mel = self.src_load_fn(self.src_mel_files[idx])
+            trg_mel = self.trg_load_fn(self.trg_mel_files[idx])
 
         if self.return_utt_id:
             items = utt_id, src_mel, trg_mel
         else:
             items = src_mel, trg_mel
 
-        if self.allow_cache:
-            self.caches[idx] = items
-
         return items
 
     def __len__(self):
@@ -437,7 +526,21 @@ class ParallelVCMelDataset(Dataset):
             int: The length of dataset.
 
         """
-        return len(self.mel_files)
+        return len(self.src_mel_files)
+
+    def lengths(self):
+        """Return source mel lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each source feature sequence (in frames).
+
+        """
+        if self._src_mel_lengths is None:
+            self._src_mel_lengths = np.asarray(
+                _scan_lengths(self.src_mel_files.tolist(), self.src_load_fn),
+                dtype=np.int64,
+            )
+        return self._src_mel_lengths
 
 
 class SourceVCMelDataset(Dataset):
@@ -464,24 +567,26 @@ class SourceVCMelDataset(Dataset):
 
         """
         # find all of the mel files
-        self.src_mel_files = sorted(find_files(src_root_dir, mel_query))
+        src_mel_files = sorted(find_files(src_root_dir, mel_query))
 
         # assert the number of files
-        assert (
-            len(self.src_mel_files) != 0
-        ), f"Not found any mel files in ${src_root_dir}."
+        assert len(src_mel_files) != 0, f"Not found any mel files in ${src_root_dir}."
 
+        self.src_mel_files = np.array(src_mel_files, dtype=object)
         self.mel_load_fn = mel_load_fn
+        self._mel_lengths = None
         self.utt_ids = [
-            os.path.splitext(os.path.basename(f))[0] for f in self.src_mel_files
+            os.path.splitext(os.path.basename(f))[0] for f in src_mel_files
         ]
         self.return_utt_id = return_utt_id
         self.allow_cache = allow_cache
         if allow_cache:
-            # NOTE(kan-bayashi): Manager is need to share memory in dataloader with num_workers > 0
-            self.manager = Manager()
-            self.caches = self.manager.list()
-            self.caches += [() for _ in range(len(self.src_mel_files))]
+            # NOTE: pre-load everything into shared-memory tensors so that cached
+            # arrays are zero-copy across dataloader workers instead of
+            # round-tripping through a multiprocessing.Manager proxy per access
+            self.caches = [
+                _to_shared_tensor(mel_load_fn(mel_file)) for mel_file in src_mel_files
+            ]
 
     def __getitem__(self, idx):
         """Get specified idx items.
@@ -494,20 +599,17 @@ class SourceVCMelDataset(Dataset):
             ndarray: Feature (T', C).
 
         """
-        if self.allow_cache and len(self.caches[idx]) != 0:
-            return self.caches[idx]
-
         utt_id = self.utt_ids[idx]
-        src_mel = self.mel_load_fn(self.src_mel_files[idx])
+        if self.allow_cache:
+            src_mel = self.caches[idx].numpy()
+        else:
+            src_mel = self.mel_load_fn(self.src_mel_files[idx])
 
         if self.return_utt_id:
             items = utt_id, src_mel
         else:
             items = src_mel
 
-        if self.allow_cache:
-            self.caches[idx] = items
-
         return items
 
     def __len__(self):
@@ -518,3 +620,17 @@ class SourceVCMelDataset(Dataset):
 
         """
         return len(self.src_mel_files)
+
+    def lengths(self):
+        """Return source mel lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each source feature sequence (in frames).
+
+        """
+        if self._mel_lengths is None:
+            self._mel_lengths = np.asarray(
+                _scan_lengths(self.src_mel_files.tolist(), self.mel_load_fn),
+                dtype=np.int64,
+            )
+        return self._mel_lengths
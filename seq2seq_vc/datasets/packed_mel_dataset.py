@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2023 Wen-Chin Huang
+#  MIT License (https://opensource.org/licenses/MIT)
+
+"""Packed mel dataset modules."""
+
+import os
+
+import numpy as np
+
+from torch.utils.data import Dataset
+
+
+class PackedMelDataset(Dataset):
+    """PyTorch compatible mel dataset backed by a single packed mmap shard.
+
+    Reads features packed by bin/pack_mels.py: a flat float32 feats.bin, an
+    int64 frame-offsets index (offsets.npy, shape [N + 1]), the number of
+    channels (shape.npy), and the utterance ids in packing order
+    (utt_ids.txt). Each access is a plain memory-mapped slice, so per-file
+    open/parse overhead is avoided and the mapped pages are shared across
+    dataloader workers.
+    """
+
+    def __init__(
+        self,
+        packed_dir,
+        return_utt_id=False,
+    ):
+        """Initialize dataset.
+
+        Args:
+            packed_dir (str): Directory including the packed shard files.
+            return_utt_id (bool): Whether to return the utterance id with arrays.
+
+        """
+        self.offsets = np.load(os.path.join(packed_dir, "offsets.npy"))
+        self.channels = int(np.load(os.path.join(packed_dir, "shape.npy"))[0])
+        with open(os.path.join(packed_dir, "utt_ids.txt")) as f:
+            self.utt_ids = [line.strip() for line in f if line.strip()]
+        assert len(self.utt_ids) == len(self.offsets) - 1, (
+            f"Number of utterance ids and offsets are inconsistent "
+            f"({len(self.utt_ids)} vs {len(self.offsets) - 1})."
+        )
+
+        self.data = np.memmap(
+            os.path.join(packed_dir, "feats.bin"), dtype=np.float32, mode="r"
+        )
+        self.mel_lengths = np.diff(self.offsets)
+        self.return_utt_id = return_utt_id
+
+    def __getitem__(self, idx):
+        """Get specified idx items.
+
+        Args:
+            idx (int): Index of the item.
+
+        Returns:
+            str: Utterance id (only in return_utt_id = True).
+            ndarray: Feature (T', C).
+
+        """
+        utt_id = self.utt_ids[idx]
+        start = self.offsets[idx] * self.channels
+        end = self.offsets[idx + 1] * self.channels
+        mel = np.asarray(self.data[start:end]).reshape(-1, self.channels)
+
+        if self.return_utt_id:
+            items = utt_id, mel
+        else:
+            items = mel
+
+        return items
+
+    def __len__(self):
+        """Return dataset length.
+
+        Returns:
+            int: The length of dataset.
+
+        """
+        return len(self.utt_ids)
+
+    def lengths(self):
+        """Return mel lengths as an int64 array for bucket samplers.
+
+        Returns:
+            ndarray: Lengths of each feature sequence (in frames).
+
+        """
+        return self.mel_lengths
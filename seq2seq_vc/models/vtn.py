@@ -317,11 +317,20 @@ class VTN(torch.nn.Module):
             Tensor: Encoder-decoder (source) attention weights (#layers, #heads, L, T).
 
         """
-        # get options
-        threshold = inference_args["threshold"]
-        minlenratio = inference_args["minlenratio"]
-        maxlenratio = inference_args["maxlenratio"]
+        hs = self.encode(x, spemb=spemb)
+        return self.decode_iter(hs, inference_args)
+
+    def encode(self, x, spemb=None):
+        """Run the encoder once so that it can be reused across decoder steps.
+
+        Args:
+            x (Tensor): Input sequence of acoustic features (T, idim).
+            spemb (Tensor, optional): Speaker embedding vector (spk_embed_dim).
+
+        Returns:
+            Tensor: Encoder memory (1, T', adim).
 
+        """
         # forward encoder
         x = x.unsqueeze(0)
         hs, _ = self.encoder(x, None)
@@ -331,6 +340,37 @@ class VTN(torch.nn.Module):
             spembs = spemb.unsqueeze(0)
             hs = self._integrate_with_spk_embed(hs, spembs)
 
+        return hs
+
+    def decode_iter(self, hs, inference_args, use_cuda_graphs=False):
+        """Decode autoregressively from pre-computed encoder memory.
+
+        The decoder self-attention reuses the layer-wise cache across steps,
+        so each step only computes the newest frame against the cached states.
+
+        Args:
+            hs (Tensor): Encoder memory computed by encode() (1, T', adim).
+            inference_args (dict):
+                - threshold (float): Threshold in inference.
+                - minlenratio (float): Minimum length ratio in inference.
+                - maxlenratio (float): Maximum length ratio in inference.
+            use_cuda_graphs (bool): Whether to replay the decoder step from a
+                captured CUDA graph (CUDA only).
+
+        Returns:
+            Tensor: Output sequence of features (L, odim).
+            Tensor: Output sequence of stop probabilities (L,).
+            Tensor: Encoder-decoder (source) attention weights (#layers, #heads, L, T).
+
+        """
+        if use_cuda_graphs and hs.is_cuda:
+            return self._decode_iter_cuda_graph(hs, inference_args)
+
+        # get options
+        threshold = inference_args["threshold"]
+        minlenratio = inference_args["minlenratio"]
+        maxlenratio = inference_args["maxlenratio"]
+
         # set limits of length
         maxlen = int(hs.size(1) * maxlenratio / self.decoder_reduction_factor)
         minlen = int(hs.size(1) * minlenratio / self.decoder_reduction_factor)
@@ -347,7 +387,7 @@ class VTN(torch.nn.Module):
             idx += 1
 
             # calculate output and stop prob at idx-th step
-            y_masks = subsequent_mask(idx).unsqueeze(0).to(x.device)
+            y_masks = subsequent_mask(idx).unsqueeze(0).to(hs.device)
             z, z_cache = self.decoder.forward_one_step(
                 ys, y_masks, hs, cache=z_cache
             )  # (B, adim)
@@ -361,10 +401,12 @@ class VTN(torch.nn.Module):
                 (ys, outs[-1][-1].view(1, 1, self.odim)), dim=1
             )  # (1, idx + 1, odim)
 
-            # get attention weights
+            # get attention weights (not materialized under fused SDPA)
             att_ws_ = []
             for name, m in self.named_modules():
                 if isinstance(m, MultiHeadedAttention) and "src" in name:
+                    if m.attn is None:
+                        continue
                     att_ws_ += [m.attn[0, :, -1].unsqueeze(1)]  # [(#heads, 1, T),...]
             if idx == 1:
                 att_ws = att_ws_
@@ -390,7 +432,249 @@ class VTN(torch.nn.Module):
                 break
 
         # concatenate attention weights -> (#layers, #heads, L, T)
-        att_ws = torch.stack(att_ws, dim=0)
+        att_ws = torch.stack(att_ws, dim=0) if len(att_ws) > 0 else None
+
+        return outs, probs, att_ws
+
+    def _decode_iter_cuda_graph(self, hs, inference_args):
+        """Decode by replaying a captured CUDA graph for each decoder step.
+
+        One decoder step is captured with statically sized buffers: the
+        padded target buffer, encoder memory, and memory mask are rounded up
+        to bucket sizes, and each step only updates the buffer contents
+        before replaying the graph. The step therefore runs the decoder over
+        the whole padded target length without the incremental cache, which
+        costs extra FLOPs but removes per-kernel launch overhead from the
+        loop; this pays off for short, launch-bound utterances. Graphs are
+        cached per (target, memory) bucket and reused across utterances.
+        """
+        # get options
+        threshold = inference_args["threshold"]
+        minlenratio = inference_args["minlenratio"]
+        maxlenratio = inference_args["maxlenratio"]
+
+        # set limits of length
+        maxlen = int(hs.size(1) * maxlenratio / self.decoder_reduction_factor)
+        minlen = int(hs.size(1) * minlenratio / self.decoder_reduction_factor)
+
+        # round buffer sizes up to buckets so that graphs are reusable
+        bucket = 64
+        tgt_len = ((max(maxlen, 1) + bucket - 1) // bucket) * bucket
+        mem_len = ((hs.size(1) + bucket - 1) // bucket) * bucket
+
+        if not hasattr(self, "_decode_graphs"):
+            self._decode_graphs = {}
+        static = self._decode_graphs.get((tgt_len, mem_len))
+        if static is None:
+            static = {
+                "ys": hs.new_zeros(1, tgt_len, self.odim),
+                "hs": hs.new_zeros(1, mem_len, hs.size(2)),
+                "hs_mask": torch.zeros(
+                    1, 1, mem_len, dtype=torch.bool, device=hs.device
+                ),
+                "y_masks": subsequent_mask(tgt_len, device=hs.device).unsqueeze(0),
+                "pos": torch.zeros(1, dtype=torch.long, device=hs.device),
+            }
+
+            def _step():
+                zs, _ = self.decoder(
+                    static["ys"], static["y_masks"], static["hs"], static["hs_mask"]
+                )
+                z = zs.index_select(1, static["pos"])  # (1, 1, adim)
+                out = self.feat_out(z).view(self.decoder_reduction_factor, self.odim)
+                prob = torch.sigmoid(self.prob_out(z)).view(
+                    self.decoder_reduction_factor
+                )
+                return out, prob
+
+            # warm up on a side stream, then capture one step
+            warmup_stream = torch.cuda.Stream()
+            warmup_stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(warmup_stream):
+                for _ in range(3):
+                    _step()
+            torch.cuda.current_stream().wait_stream(warmup_stream)
+
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                static["out"], static["prob"] = _step()
+            static["graph"] = graph
+            self._decode_graphs[(tgt_len, mem_len)] = static
+
+        # fill the static buffers for this utterance
+        static["ys"].zero_()
+        static["hs"].zero_()
+        static["hs"][:, : hs.size(1)].copy_(hs)
+        static["hs_mask"].zero_()
+        static["hs_mask"][..., : hs.size(1)] = True
+
+        # forward decoder step-by-step by replaying the captured graph
+        idx = 0
+        probs = []
+        while True:
+            # update index
+            idx += 1
+
+            # calculate output and stop prob at idx-th step
+            static["pos"].fill_(idx - 1)
+            static["graph"].replay()
+            probs += [static["prob"].clone()]  # [(r), ...]
+
+            # update next inputs
+            if idx < tgt_len:
+                static["ys"][0, idx].copy_(static["out"][-1])
+
+            # check whether to finish generation
+            if int(sum(probs[-1] >= threshold)) > 0 or idx >= maxlen:
+                # check mininum length
+                if idx < minlen:
+                    continue
+                break
+
+        # the graph only materializes the stop-decision row per step, so run
+        # one eager pass over the generated frames for outputs and attentions
+        ys = static["ys"][:, :idx]
+        y_masks = subsequent_mask(idx, device=hs.device).unsqueeze(0)
+        zs, _ = self.decoder(ys, y_masks, hs, None)
+        outs = (
+            self.feat_out(zs).view(1, -1, self.odim).transpose(1, 2)
+        )  # (1, odim, L)
+        if self.postnet is not None:
+            outs = outs + self.postnet(outs)  # (1, odim, L)
+        outs = outs.transpose(2, 1).squeeze(0)  # (L, odim)
+        probs = torch.cat(probs, dim=0)
+
+        # collect attention weights -> (#layers, #heads, L, T)
+        att_ws = []
+        for name, m in self.named_modules():
+            if isinstance(m, MultiHeadedAttention) and "src" in name:
+                if m.attn is None:
+                    continue
+                att_ws += [m.attn[0]]  # [(#heads, L, T), ...]
+        att_ws = torch.stack(att_ws, dim=0) if len(att_ws) > 0 else None
+
+        return outs, probs, att_ws
+
+    def batch_inference(self, xs, ilens, inference_args, spembs=None):
+        """Generate the sequences of features for a batch of padded inputs.
+
+        Args:
+            xs (Tensor): Batch of padded input features (B, Tmax, idim).
+            ilens (LongTensor): Batch of lengths of each input (B,).
+            inference_args (dict):
+                - threshold (float): Threshold in inference.
+                - minlenratio (float): Minimum length ratio in inference.
+                - maxlenratio (float): Maximum length ratio in inference.
+            spembs (Tensor, optional): Batch of speaker embeddings (B, spk_embed_dim).
+
+        Returns:
+            list: List of output feature sequences [(L_b, odim), ...].
+            list: List of stop probability sequences [(L_b,), ...].
+            list: List of source attention weights [(#layers, #heads, L_b, T_b), ...].
+
+        """
+        # get options
+        threshold = inference_args["threshold"]
+        minlenratio = inference_args["minlenratio"]
+        maxlenratio = inference_args["maxlenratio"]
+
+        # forward encoder with padding masks
+        x_masks = self._source_mask(ilens).to(xs.device)
+        hs, hs_masks = self.encoder(xs, x_masks)
+
+        # integrate speaker embedding
+        if self.spk_embed_dim is not None:
+            hs = self._integrate_with_spk_embed(hs, spembs)
+
+        # set per-sample limits of length
+        hlens = hs_masks.squeeze(1).sum(-1)  # (B,)
+        maxlens = (hlens * maxlenratio / self.decoder_reduction_factor).long()
+        minlens = (hlens * minlenratio / self.decoder_reduction_factor).long()
+        maxlen = int(maxlens.max())
+
+        # initialize
+        batch_size = xs.size(0)
+        idx = 0
+        ys = hs.new_zeros(batch_size, 1, self.odim)
+        outs, probs = [], []
+        olens = maxlens.clone()
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=xs.device)
+
+        # forward decoder step-by-step
+        z_cache = None
+        while True:
+            # update index
+            idx += 1
+
+            # calculate output and stop prob at idx-th step
+            y_masks = subsequent_mask(idx).unsqueeze(0).to(xs.device)
+            z, z_cache = self.decoder.forward_one_step(
+                ys, y_masks, hs, memory_mask=hs_masks, cache=z_cache
+            )  # (B, adim)
+            outs += [
+                self.feat_out(z).view(
+                    batch_size, self.decoder_reduction_factor, self.odim
+                )
+            ]  # [(B, r, odim), ...]
+            probs += [torch.sigmoid(self.prob_out(z))]  # [(B, r), ...]
+
+            # update next inputs
+            ys = torch.cat(
+                (ys, outs[-1][:, -1].view(batch_size, 1, self.odim)), dim=1
+            )  # (B, idx + 1, odim)
+
+            # get attention weights (not materialized under fused SDPA)
+            att_ws_ = []
+            for name, m in self.named_modules():
+                if isinstance(m, MultiHeadedAttention) and "src" in name:
+                    if m.attn is None:
+                        continue
+                    att_ws_ += [m.attn[:, :, -1:]]  # [(B, #heads, 1, T), ...]
+            if idx == 1:
+                att_ws = att_ws_
+            else:
+                # [(B, #heads, l, T), ...]
+                att_ws = [
+                    torch.cat([att_w, att_w_], dim=2)
+                    for att_w, att_w_ in zip(att_ws, att_ws_)
+                ]
+
+            # check whether to finish generation for each sample
+            stop = (probs[-1] >= threshold).any(dim=-1) & (minlens <= idx)
+            stop |= maxlens <= idx
+            newly_finished = stop & ~finished
+            olens[newly_finished] = idx
+            finished |= newly_finished
+            if bool(finished.all()):
+                break
+
+        # (B, Lmax//r * r, odim) -> (B, odim, Lmax//r * r)
+        outs = torch.cat(outs, dim=1).transpose(1, 2)
+        # zero out post-stop frames so that through the postnet's receptive
+        # field each sample sees the same zero edge padding as in inference,
+        # independently of which utterances share the batch
+        out_masks = make_non_pad_mask(olens * self.decoder_reduction_factor).to(
+            outs.device
+        )  # (B, Lmax//r * r)
+        outs = outs.masked_fill(~out_masks.unsqueeze(1), 0.0)
+        if self.postnet is not None:
+            outs = outs + self.postnet(outs)  # (B, odim, L)
+        outs = outs.transpose(2, 1)  # (B, L, odim)
+        probs = torch.cat(probs, dim=1)  # (B, L)
+
+        # remove padded positions using per-sample lengths
+        r = self.decoder_reduction_factor
+        outs = [out[: olen * r] for out, olen in zip(outs, olens.tolist())]
+        probs = [prob[: olen * r] for prob, olen in zip(probs, olens.tolist())]
+        if len(att_ws) > 0:
+            # concatenate attention weights -> (B, #layers, #heads, Lmax//r, Tmax)
+            att_ws = torch.stack(att_ws, dim=1)
+            att_ws = [
+                att_w[:, :, :olen, :hlen]
+                for att_w, olen, hlen in zip(att_ws, olens.tolist(), hlens.tolist())
+            ]
+        else:
+            att_ws = [None] * batch_size
 
         return outs, probs, att_ws
 
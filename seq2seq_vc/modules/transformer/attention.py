@@ -12,6 +12,26 @@ import torch
 from torch import nn
 
 
+def enable_sdpa(model, mode=True):
+    """Switch vanilla MultiHeadedAttention modules to fused SDPA kernels.
+
+    scaled_dot_product_attention computes softmax(QK^T)V in one fused kernel
+    with memory-efficient tiling, so the (time1, time2) attention map is never
+    materialized. Consumers that need the attention weights (guided attention
+    loss, attention plots) should keep SDPA disabled.
+
+    Args:
+        model (torch.nn.Module): Model whose attention modules are switched.
+        mode (bool): Whether to enable the fused kernels.
+
+    """
+    for m in model.modules():
+        # relative-position variants need explicit score matrices, so only
+        # the vanilla attention is switched
+        if type(m) is MultiHeadedAttention:
+            m.use_sdpa = mode
+
+
 class MultiHeadedAttention(nn.Module):
     """Multi-Head Attention layer.
 
@@ -35,6 +55,7 @@ class MultiHeadedAttention(nn.Module):
         self.linear_out = nn.Linear(n_feat, n_feat)
         self.attn = None
         self.dropout = nn.Dropout(p=dropout_rate)
+        self.use_sdpa = False
 
     def forward_qkv(self, query, key, value):
         """Transform query, key and value.
@@ -107,9 +128,46 @@ class MultiHeadedAttention(nn.Module):
 
         """
         q, k, v = self.forward_qkv(query, key, value)
+        if self.use_sdpa:
+            return self.forward_sdpa(q, k, v, mask)
         scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.d_k)
         return self.forward_attention(v, scores, mask)
 
+    def forward_sdpa(self, q, k, v, mask):
+        """Compute attention with the fused scaled_dot_product_attention kernel.
+
+        The attention map is not materialized on this path, so self.attn is
+        left as None.
+
+        Args:
+            q (torch.Tensor): Transformed query tensor (#batch, n_head, time1, d_k).
+            k (torch.Tensor): Transformed key tensor (#batch, n_head, time2, d_k).
+            v (torch.Tensor): Transformed value tensor (#batch, n_head, time2, d_k).
+            mask (torch.Tensor): Mask (#batch, 1, time2) or (#batch, time1, time2).
+
+        Returns:
+            torch.Tensor: Output tensor (#batch, time1, d_model).
+
+        """
+        n_batch = q.size(0)
+        if mask is not None:
+            attn_mask = mask.unsqueeze(1).ne(0)  # (batch, 1, *, time2)
+        else:
+            attn_mask = None
+        self.attn = None
+        x = torch.nn.functional.scaled_dot_product_attention(
+            q,
+            k,
+            v,
+            attn_mask=attn_mask,
+            dropout_p=self.dropout.p if self.training else 0.0,
+        )  # (batch, head, time1, d_k)
+        x = (
+            x.transpose(1, 2).contiguous().view(n_batch, -1, self.h * self.d_k)
+        )  # (batch, time1, d_model)
+
+        return self.linear_out(x)  # (batch, time1, d_model)
+
 
 class LegacyRelPositionMultiHeadedAttention(MultiHeadedAttention):
     """Multi-Head Attention layer with relative position encoding (old version).
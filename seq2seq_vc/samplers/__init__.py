@@ -0,0 +1 @@
+from .length_bucket import *  # NOQA
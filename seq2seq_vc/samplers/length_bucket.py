@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2023 Wen-Chin Huang
+#  MIT License (https://opensource.org/licenses/MIT)
+
+"""Length-bucket batch sampler modules."""
+
+import numpy as np
+
+from torch.utils.data import Sampler
+
+
+class LengthBucketSampler(Sampler):
+    """Batch sampler which groups samples of similar lengths.
+
+    Samples are sorted by length and greedily packed into buckets so that
+    each bucket holds at most batch_size samples and the padded size of the
+    bucket (number of samples x longest sample) does not exceed
+    max_frames_per_batch. This keeps the padding overhead of batched
+    inference small while bounding the peak memory of each batch.
+    """
+
+    def __init__(self, lengths, batch_size, max_frames_per_batch=None):
+        """Initialize length bucket sampler.
+
+        Args:
+            lengths (list): List of sample lengths (in frames).
+            batch_size (int): Maximum number of samples in a bucket.
+            max_frames_per_batch (int): Maximum number of padded frames in a
+                bucket. If None, only batch_size limits the bucket size.
+
+        """
+        assert batch_size > 0, "batch_size must be positive."
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+
+        # sort by length so that samples in a bucket have similar lengths
+        sorted_idxs = np.argsort(self.lengths, kind="stable")[::-1]
+
+        # greedily pack sorted samples into buckets
+        self.buckets = []
+        bucket = []
+        for idx in sorted_idxs.tolist():
+            max_length = max([self.lengths[i] for i in bucket + [idx]])
+            if len(bucket) > 0 and (
+                len(bucket) >= batch_size
+                or (
+                    max_frames_per_batch is not None
+                    and (len(bucket) + 1) * max_length > max_frames_per_batch
+                )
+            ):
+                self.buckets.append(bucket)
+                bucket = []
+            bucket.append(idx)
+        if len(bucket) > 0:
+            self.buckets.append(bucket)
+
+    def __iter__(self):
+        """Return the iterator over buckets of sample indices."""
+        return iter(self.buckets)
+
+    def __len__(self):
+        """Return the number of buckets.
+
+        Returns:
+            int: The number of buckets.
+
+        """
+        return len(self.buckets)
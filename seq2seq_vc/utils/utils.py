@@ -14,6 +14,7 @@ import tarfile
 
 from distutils.version import LooseVersion
 from filelock import FileLock
+from functools import partial
 
 import h5py
 import numpy as np
@@ -70,6 +71,67 @@ def read_hdf5(hdf5_name, hdf5_path):
     return hdf5_data
 
 
+def get_length_cached(path, key=None, load_fn=None):
+    """Get the first-dimension length of a dumped feature file with caching.
+
+    The length is stored in a "{path}.len" sidecar file so that later scans do
+    not need to load the data again. A stale sidecar (older than the data
+    file) is ignored and rewritten.
+
+    Args:
+        path (str): Filename of the dumped feature file.
+        key (str): Dataset name in the hdf5 file. If given for an hdf5 file,
+            only the shape metadata is read instead of the full dataset.
+        load_fn (func): Function to load the file, used as a fallback when the
+            length cannot be read from the metadata alone.
+
+    Return:
+        int: Length of the first dimension of the stored array.
+
+    """
+    sidecar = f"{path}.len"
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(
+        path
+    ):
+        try:
+            with open(sidecar) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            # a truncated or partially written sidecar (e.g. from a killed
+            # run or a concurrent writer) is treated as a cache miss
+            pass
+
+    # recover the dataset name from a partial of read_hdf5 so that only the
+    # shape metadata needs to be read instead of the full dataset
+    if key is None and isinstance(load_fn, partial) and load_fn.func is read_hdf5:
+        key = load_fn.keywords.get("hdf5_path")
+
+    if path.endswith(".npy"):
+        # header-only read; no data pages are materialized
+        length = np.load(path, mmap_mode="r").shape[0]
+    elif path.endswith(".h5") and key is not None:
+        with h5py.File(path, "r") as f:
+            length = f[key].shape[0]
+    elif load_fn is not None:
+        length = load_fn(path).shape[0]
+    else:
+        raise ValueError(f"Cannot get the length of {path} without load_fn.")
+
+    try:
+        # write via a per-process temp file and rename so that concurrent
+        # readers (e.g. torchrun ranks scanning the same dump on a cold
+        # cache) never observe a partially written sidecar
+        tmp = f"{sidecar}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(length))
+        os.replace(tmp, sidecar)
+    except OSError:
+        # the dump directory may be read-only; caching is best-effort
+        pass
+
+    return length
+
+
 def write_hdf5(hdf5_name, hdf5_path, write_data, is_overwrite=True):
     """Write dataset to hdf5.
 
@@ -116,6 +178,46 @@ def write_hdf5(hdf5_name, hdf5_path, write_data, is_overwrite=True):
     hdf5_file.close()
 
 
+def write_hdf5_direct(hdf5_name, hdf5_path, write_data):
+    """Write a float32 ndarray to hdf5 bypassing the filter pipeline.
+
+    The dataset is created with a single chunk matching the array shape and
+    the raw bytes are written with write_direct_chunk, which skips the
+    hyperslab selection, dtype conversion, and filter stages of the regular
+    write path. Unlike write_hdf5, the output file is always recreated. Falls
+    back to write_hdf5 when direct chunk writing is not available.
+
+    Args:
+        hdf5_name (str): Hdf5 dataset filename.
+        hdf5_path (str): Dataset path in hdf5.
+        write_data (ndarray): Data to write.
+
+    """
+    write_data = np.ascontiguousarray(write_data, dtype=np.float32)
+
+    # check folder existence
+    folder_name, _ = os.path.split(hdf5_name)
+    if not os.path.exists(folder_name) and len(folder_name) != 0:
+        os.makedirs(folder_name)
+
+    try:
+        with h5py.File(hdf5_name, "w") as hdf5_file:
+            dataset = hdf5_file.create_dataset(
+                hdf5_path,
+                shape=write_data.shape,
+                dtype=np.float32,
+                chunks=write_data.shape,
+            )
+            dataset.id.write_direct_chunk(
+                (0,) * write_data.ndim, write_data.tobytes()
+            )
+    except Exception as e:
+        logging.warning(
+            f"Direct chunk write failed ({e}). Falling back to write_hdf5."
+        )
+        write_hdf5(hdf5_name, hdf5_path, write_data)
+
+
 class HDF5ScpLoader(object):
     """Loader class for a fests.scp file of hdf5 file.
 
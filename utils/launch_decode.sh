@@ -0,0 +1,19 @@
+#!/usr/bin/env bash
+
+# Copyright 2023 Wen-Chin Huang (Nagoya University)
+#  MIT License (https://opensource.org/licenses/MIT)
+
+# Launch multi-GPU data-parallel decoding with torchrun.
+# Each process decodes a non-overlapping shard of the dataset and writes
+# outputs keyed by utt_id, so no aggregation step is needed.
+
+if [ $# -lt 2 ]; then
+    echo "Usage: $0 <n_gpus> <vc_decode.py options ...>"
+    echo "e.g.: $0 4 --dumpdir dump/dev --checkpoint exp/checkpoint.pkl ..."
+    exit 1
+fi
+
+n_gpus=$1
+shift
+
+torchrun --nproc_per_node "${n_gpus}" "$(command -v vc_decode.py)" "$@"